@@ -5,67 +5,193 @@ Monitors network latency to specified hosts
 """
 
 import os
+import re
+import math
 import time
+import socket
+import ssl
+import http.client
+import struct
 import subprocess
 import threading
 import json
+import sys
+import logging
+import logging.handlers
+from bisect import bisect_right
 from datetime import datetime
+from array import array
 from collections import deque
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from flask import Flask, render_template, jsonify, request
 
 app = Flask(__name__)
 
+
+class BatchLogHandler(logging.handlers.MemoryHandler):
+    """Buffer log records and write each batch to the stream in one call
+
+    Flushes when the buffer fills, on WARNING or above, and at the end of
+    every monitor cycle, instead of one write per log line.
+    """
+
+    def __init__(self, stream, capacity=256):
+        super().__init__(capacity, flushLevel=logging.WARNING)
+        self.stream = stream
+
+    def flush(self):
+        with self.lock:
+            if self.buffer:
+                self.stream.write(''.join(self.format(record) + '\n' for record in self.buffer))
+                self.stream.flush()
+                self.buffer.clear()
+
+
+log = logging.getLogger('latency_monitor')
+log_handler = BatchLogHandler(sys.stdout)
+log_handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+log.addHandler(log_handler)
+log.propagate = False
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+if LOG_LEVEL in logging.getLevelNamesMapping():
+    log.setLevel(LOG_LEVEL)
+else:
+    # A typo shouldn't stop the app from booting
+    log.setLevel(logging.INFO)
+    log.warning("Unknown LOG_LEVEL %r, using INFO", LOG_LEVEL)
+
 # Try to import oracledb for Oracle DB connectivity testing
 try:
     import oracledb
     ORACLE_AVAILABLE = True
-    print("Oracle DB support enabled (oracledb module loaded)", flush=True)
+    log.info("Oracle DB support enabled (oracledb module loaded)")
 except ImportError:
     ORACLE_AVAILABLE = False
-    print("Oracle DB support disabled (oracledb module not available)", flush=True)
+    log.info("Oracle DB support disabled (oracledb module not available)")
 
 # Configuration
 DEFAULT_HOSTS = os.getenv('MONITORED_HOSTS', 'vcenter.skynetsystems.io,google.com,cloudflare.com').split(',')
 CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', '60'))  # seconds
 TCP_PORT = int(os.getenv('TCP_PORT', '443'))  # TCP port for latency checks
+MAX_PROBE_WORKERS = 32  # Upper bound on concurrent host and Oracle probes
+PROBES_PER_CYCLE = max(1, int(os.getenv('PROBES_PER_CYCLE', '1')))  # TCP/HTTP samples per host per check
+PROBE_BUDGET = max(1, CHECK_INTERVAL - 1)  # seconds a cycle waits for its probes
+ORACLE_CONNECT_TIMEOUT = 3  # seconds to wait for an Oracle listener
+DNS_CACHE_TTL = int(os.getenv('DNS_CACHE_TTL', '900'))  # seconds to reuse a resolved host address
+# Let a fronting Apache (mod_xsendfile) or lighttpd send static files (X-Sendfile)
+# instead of the worker; nginx ignores X-Sendfile (it uses X-Accel-Redirect)
+USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+
+app.config['USE_X_SENDFILE'] = USE_X_SENDFILE
 
 # Calculate max history for 24 hours
 MAX_HISTORY = int(86400 / CHECK_INTERVAL)
 
-print(f"Configuration: CHECK_INTERVAL={CHECK_INTERVAL}s, MAX_HISTORY={MAX_HISTORY} data points (24 hours)", flush=True)
+log.info("Configuration: CHECK_INTERVAL=%ss, MAX_HISTORY=%s data points (24 hours)", CHECK_INTERVAL, MAX_HISTORY)
 
 # Persistent storage files
 HOST_FILE = '/tmp/monitored_hosts.txt'
 ORACLE_FILE = '/tmp/monitored_oracle_dbs.json'
+_hosts_mtime = 0  # HOST_FILE st_mtime_ns when monitored_hosts was last synced
+_oracle_mtime = 0  # ORACLE_FILE st_mtime_ns when oracle_dbs was last synced
+hosts_dirty = threading.Event()  # Set when monitored_hosts has unsaved changes
+oracle_dirty = threading.Event()  # Set when oracle_dbs has unsaved changes
+SAVE_DELAY = 0.5  # seconds to coalesce changes before saving
 
 def load_hosts():
     """Load hosts from persistent storage or use defaults"""
+    global _hosts_mtime
     if os.path.exists(HOST_FILE):
         try:
             with open(HOST_FILE, 'r') as f:
+                _hosts_mtime = os.fstat(f.fileno()).st_mtime_ns
                 hosts = set(line.strip() for line in f.readlines() if line.strip())
                 if hosts:
-                    print(f"Loaded {len(hosts)} unique hosts from persistent storage", flush=True)
+                    log.info("Loaded %d unique hosts from persistent storage", len(hosts))
                     return hosts
         except Exception as e:
-            print(f"Error loading hosts from file: {e}", flush=True)
+            log.error("Error loading hosts from file: %s", e)
     
     # Use defaults if file doesn't exist or is empty
-    print(f"Using default hosts from environment", flush=True)
+    log.info("Using default hosts from environment")
     default_hosts = set(host.strip() for host in DEFAULT_HOSTS if host.strip())
     return default_hosts
 
-def save_hosts():
-    """Save current hosts to persistent storage"""
+def write_file_atomic(path, data):
+    """Replace path with data and return the new file's st_mtime_ns
+
+    The data is written with a single write() to a temp file that is then
+    renamed over path, so other workers never read a partial file.
+    """
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+        # Returned so our own write doesn't trigger a reload (rename keeps the mtime)
+        mtime = os.fstat(fd).st_mtime_ns
+    finally:
+        os.close(fd)
+    os.replace(tmp_file, path)
+    return mtime
+
+
+def save_hosts(hosts):
+    """Save hosts to persistent storage"""
+    global _hosts_mtime
+    try:
+        data = ''.join(f"{host}\n" for host in sorted(hosts)).encode()  # Sort for consistency
+        _hosts_mtime = write_file_atomic(HOST_FILE, data)
+        log.info("Saved %d unique hosts to persistent storage", len(hosts))
+    except Exception as e:
+        log.error("Error saving hosts to file: %s", e)
+
+
+def persist_hosts():
+    """Background thread that saves the host list after it changes
+
+    Waits briefly after the first change so a burst of add/remove calls is
+    written to disk once.
+    """
+    while True:
+        hosts_dirty.wait()
+        time.sleep(SAVE_DELAY)
+        hosts_dirty.clear()
+        with lock.read():
+            hosts = list(monitored_hosts)
+        save_hosts(hosts)
+
+
+def reload_hosts_if_changed():
+    """Reload hosts from persistent storage if the file changed since last sync
+
+    Keeps workers in sync at the cost of a single stat() when nothing changed.
+    """
+    global monitored_hosts, _hosts_mtime, data_version
+    if hosts_dirty.is_set():
+        return  # Local changes not yet written take precedence
+    try:
+        mtime = os.stat(HOST_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return
+    if mtime == _hosts_mtime:
+        return
+
     try:
-        # Use a set to ensure uniqueness
-        unique_hosts = set(monitored_hosts)
-        with open(HOST_FILE, 'w') as f:
-            for host in sorted(unique_hosts):  # Sort for consistency
-                f.write(f"{host}\n")
-        print(f"Saved {len(unique_hosts)} unique hosts to persistent storage", flush=True)
+        with open(HOST_FILE, 'r') as f:
+            file_hosts = set(line.strip() for line in f if line.strip())
     except Exception as e:
-        print(f"Error saving hosts to file: {e}", flush=True)
+        log.error("Error reloading hosts: %s", e)
+        return
+
+    with lock.write():
+        _hosts_mtime = mtime
+        if file_hosts:
+            monitored_hosts = file_hosts
+            data_version += 1
+    log.info("Reloaded %d hosts from file", len(file_hosts))
 
 
 def load_oracle_dbs():
@@ -77,26 +203,76 @@ def load_oracle_dbs():
                     "user": "monitor", "password": "***"}
     }
     """
+    global _oracle_mtime
     if os.path.exists(ORACLE_FILE):
         try:
-            with open(ORACLE_FILE, 'r') as f:
+            with open(ORACLE_FILE, 'rb') as f:
+                _oracle_mtime = os.fstat(f.fileno()).st_mtime_ns
                 dbs = json.load(f)
                 if dbs:
-                    print(f"Loaded {len(dbs)} Oracle DBs from persistent storage", flush=True)
+                    log.info("Loaded %d Oracle DBs from persistent storage", len(dbs))
                     return dbs
         except Exception as e:
-            print(f"Error loading Oracle DBs from file: {e}", flush=True)
+            log.error("Error loading Oracle DBs from file: %s", e)
     return {}
 
 
-def save_oracle_dbs():
+def save_oracle_dbs(dbs):
     """Save Oracle DB configurations to persistent storage"""
+    global _oracle_mtime
+    try:
+        data = json.dumps(dbs, indent=2).encode()
+        _oracle_mtime = write_file_atomic(ORACLE_FILE, data)
+        log.info("Saved %d Oracle DBs to persistent storage", len(dbs))
+    except Exception as e:
+        log.error("Error saving Oracle DBs to file: %s", e)
+
+
+def persist_oracle_dbs():
+    """Background thread that saves Oracle DB configurations after they change"""
+    while True:
+        oracle_dirty.wait()
+        time.sleep(SAVE_DELAY)
+        oracle_dirty.clear()
+        with lock.read():
+            dbs = dict(oracle_dbs)
+        save_oracle_dbs(dbs)
+
+
+def reload_oracle_dbs_if_changed():
+    """Reload Oracle DB configurations if ORACLE_FILE changed since last sync
+
+    Same mtime check as reload_hosts_if_changed, so polling /api/oracle costs
+    a single stat() when nothing changed.
+    """
+    global oracle_dbs, _oracle_mtime
+    if oracle_dirty.is_set():
+        return  # Local changes not yet written take precedence
     try:
-        with open(ORACLE_FILE, 'w') as f:
-            json.dump(oracle_dbs, f, indent=2)
-        print(f"Saved {len(oracle_dbs)} Oracle DBs to persistent storage", flush=True)
+        mtime = os.stat(ORACLE_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return
+    if mtime == _oracle_mtime:
+        return
+
+    try:
+        with open(ORACLE_FILE, 'rb') as f:
+            file_dbs = json.load(f)
     except Exception as e:
-        print(f"Error saving Oracle DBs to file: {e}", flush=True)
+        log.error("Error reloading Oracle DBs: %s", e)
+        return
+
+    with lock.write():
+        _oracle_mtime = mtime
+        stale = [name for name, config in oracle_dbs.items() if file_dbs.get(name) != config]
+        oracle_dbs = file_dbs
+
+    # Drop pools for DBs removed or reconfigured elsewhere; closing can block on
+    # the DB, so it happens after the lock is released (and after the swap, so
+    # a concurrent probe can't re-create a pool for the old config)
+    for name in stale:
+        close_oracle_pool(name)
+    log.info("Reloaded %d Oracle DBs from file", len(file_dbs))
 
 
 def test_oracle_connection(config):
@@ -109,7 +285,7 @@ def test_oracle_connection(config):
         latency in ms or None if connection failed
     """
     if not ORACLE_AVAILABLE:
-        print("Oracle DB module not available", flush=True)
+        log.warning("Oracle DB module not available")
         return None
 
     host = config['host']
@@ -121,190 +297,707 @@ def test_oracle_connection(config):
     dsn = f"{host}:{port}/{service}"
 
     try:
-        start = time.time()
-        connection = oracledb.connect(user=user, password=password, dsn=dsn)
-        latency_ms = (time.time() - start) * 1000
-
-        # Run a simple query to verify connection is working
-        cursor = connection.cursor()
-        cursor.execute("SELECT 1 FROM DUAL")
-        cursor.fetchone()
-        cursor.close()
+        # A successful connect already proves the listener and credentials
+        # work, so no verification query is needed
+        start = time.perf_counter_ns()
+        connection = oracledb.connect(user=user, password=password, dsn=dsn,
+                                      tcp_connect_timeout=ORACLE_CONNECT_TIMEOUT)
+        latency_ms = (time.perf_counter_ns() - start) / 1e6
         connection.close()
 
-        print(f"Oracle DB latency to {host}:{port}/{service}: {latency_ms:.2f}ms", flush=True)
+        log.info("Oracle DB latency to %s:%s/%s: %.2fms", host, port, service, latency_ms)
         return latency_ms
     except Exception as e:
-        print(f"Oracle DB connection to {host}:{port}/{service} failed: {e}", flush=True)
+        log.warning("Oracle DB connection to %s:%s/%s failed: %s", host, port, service, e)
         return None
 
 
+# Connection pools for monitored Oracle DBs: name -> oracledb.ConnectionPool
+_oracle_pools = {}
+_oracle_pools_lock = threading.Lock()  # Guards _oracle_pools; never held while a pool closes
+
+
+def create_oracle_pool(config):
+    """Create a small connection pool for a monitored Oracle DB"""
+    dsn = f"{config['host']}:{config.get('port', 1521)}/{config['service']}"
+    return oracledb.create_pool(
+        user=config['user'], password=config['password'], dsn=dsn,
+        min=1, max=2, increment=1, timeout=300, tcp_connect_timeout=ORACLE_CONNECT_TIMEOUT,
+        getmode=oracledb.POOL_GETMODE_TIMEDWAIT, wait_timeout=5000
+    )
+
+
+def _close_pool(name, pool):
+    """Close an Oracle DB connection pool, logging any error"""
+    try:
+        pool.close(force=True)
+    except Exception as e:
+        log.warning("Error closing Oracle DB pool for %s: %s", name, e)
+
+
+def get_oracle_pool(name, config):
+    """Return (pool, created) for a monitored Oracle DB, creating the pool on first use
+
+    pool is None if the DB was removed or reconfigured while its pool was
+    being created; a pool that loses the race is closed rather than leaked.
+    """
+    with _oracle_pools_lock:
+        pool = _oracle_pools.get(name)
+    if pool is not None:
+        return pool, False
+
+    pool = create_oracle_pool(config)
+    with _oracle_pools_lock:
+        current = _oracle_pools.get(name)
+        if current is None and oracle_dbs.get(name) == config:
+            _oracle_pools[name] = pool
+            return pool, True
+    _close_pool(name, pool)
+    return current, False
+
+
+def close_oracle_pool(name):
+    """Close and forget the connection pool for an Oracle DB"""
+    with _oracle_pools_lock:
+        pool = _oracle_pools.pop(name, None)
+    if pool is not None:
+        _close_pool(name, pool)
+
+
+def oracle_probe(name, config):
+    """Measure a SELECT 1 round trip on a pooled connection to a monitored Oracle DB
+
+    The connection handshake happens once when the pool is created, so
+    steady-state samples reflect query latency rather than login cost.
+
+    Returns:
+        latency in ms or None if the query failed
+    """
+    if not ORACLE_AVAILABLE:
+        return None
+
+    try:
+        pool, new_pool = get_oracle_pool(name, config)
+        if pool is None:
+            return None  # Removed while the probe was running
+
+        start = time.perf_counter_ns()
+        with pool.acquire() as connection:
+            if new_pool:
+                # The first acquire waits for the pool's initial login
+                log.info("Oracle DB handshake to %s: %.2fms", name, (time.perf_counter_ns() - start) / 1e6)
+            # Bound the round trip so a hung session can't hold a probe worker indefinitely
+            connection.call_timeout = ORACLE_CONNECT_TIMEOUT * 1000
+            start = time.perf_counter_ns()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM DUAL")
+                cursor.fetchone()
+            latency_ms = (time.perf_counter_ns() - start) / 1e6
+
+        log.info("Oracle DB latency to %s: %.2fms", name, latency_ms)
+        return latency_ms
+    except Exception as e:
+        log.warning("Oracle DB query to %s failed: %s", name, e)
+        return None
+
+
+STATUS_DOWN = 0
+STATUS_OK = 1
+STATUS_NAMES = ('down', 'ok')
+
+# Latencies are stored as uint16 tenths of a millisecond
+LATENCY_SCALE = 10
+LATENCY_MISSING = 0xFFFF            # Sentinel for "not measured"
+LATENCY_MAX = LATENCY_MISSING - 1   # Clamp at 6553.4ms, above every probe timeout
+
+
+def quantize_latency(latency_ms):
+    """Convert a latency in ms (or None) to its uint16 storage value"""
+    if latency_ms is None:
+        return LATENCY_MISSING
+    return min(LATENCY_MAX, round(latency_ms * LATENCY_SCALE))
+
+
+@lru_cache(maxsize=MAX_HISTORY)
+def format_timestamp(timestamp_ns):
+    """Format an epoch-ns timestamp as ISO 8601
+
+    Cached because every host in a cycle shares the same timestamp and the
+    dashboard re-reads the same history on each refresh.
+    """
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
+
+class LatencyRing:
+    """Fixed-size history of latency samples
+
+    Samples are stored as parallel arrays (timestamp, latency, status) that
+    are allocated once, instead of one dict per sample. Latencies are
+    quantized to 0.1ms. Records are only built when the history is read.
+
+    Running aggregates over the successful samples in the window are
+    updated on append, so stats() is O(1).
+    """
+
+    EMPTY_STATS = {'count': 0, 'mean': None, 'stddev': None, 'min': None, 'max': None}
+
+    __slots__ = ('size', 'timestamps', 'latencies', 'http_latencies', 'statuses', 'head', 'count',
+                 'seq', 'ok_count', 'sum', 'sumsq', '_min', '_max')
+
+    def __init__(self, size=MAX_HISTORY):
+        self.size = size
+        self.timestamps = array('q', [0]) * size    # epoch nanoseconds
+        self.latencies = array('H', [0]) * size     # 0.1ms units
+        self.http_latencies = array('H', [LATENCY_MISSING]) * size  # 0.1ms units
+        self.statuses = array('B', [STATUS_DOWN]) * size
+        self.head = 0   # next slot to write
+        self.count = 0  # number of valid samples
+        self.seq = 0    # total samples ever appended
+
+        # Aggregates over successful samples currently in the window, kept in
+        # exact integer 0.1ms units so eviction never drifts
+        self.ok_count = 0
+        self.sum = 0
+        self.sumsq = 0
+        # Monotonic queues of (seq, latency) for the window min and max
+        self._min = deque()
+        self._max = deque()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, latency, http_latency=None):
+        """Record a sample, overwriting the oldest one when full"""
+        i = self.head
+        if self.count == self.size and self.statuses[i] == STATUS_OK:
+            # Drop the evicted sample from the aggregates
+            evicted = self.latencies[i]
+            self.ok_count -= 1
+            self.sum -= evicted
+            self.sumsq -= evicted * evicted
+        oldest_seq = self.seq - self.size + 1  # oldest seq left in the window
+        for queue in (self._min, self._max):
+            if queue and queue[0][0] < oldest_seq:
+                queue.popleft()
+
+        value = quantize_latency(latency) if latency else 0
+        self.timestamps[i] = timestamp
+        self.latencies[i] = value
+        self.http_latencies[i] = quantize_latency(http_latency)
+        self.statuses[i] = STATUS_OK if latency else STATUS_DOWN
+
+        if latency:
+            self.ok_count += 1
+            self.sum += value
+            self.sumsq += value * value
+            while self._min and self._min[-1][1] >= value:
+                self._min.pop()
+            self._min.append((self.seq, value))
+            while self._max and self._max[-1][1] <= value:
+                self._max.pop()
+            self._max.append((self.seq, value))
+
+        self.seq += 1
+        self.head = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def stats(self):
+        """Return count, mean, stddev, min and max of successful samples in the window"""
+        n = self.ok_count
+        if not n:
+            return dict(self.EMPTY_STATS)
+        mean = self.sum / n
+        variance = max(0.0, self.sumsq / n - mean * mean)
+        return {
+            'count': n,
+            'mean': mean / LATENCY_SCALE,
+            'stddev': math.sqrt(variance) / LATENCY_SCALE,
+            'min': self._min[0][1] / LATENCY_SCALE,
+            'max': self._max[0][1] / LATENCY_SCALE
+        }
+
+    def _chronological(self, values, limit=None):
+        """Return the newest limit valid values (all if None), oldest first"""
+        if self.count < self.size:
+            values = values[:self.count]
+        else:
+            values = values[self.head:] + values[:self.head]
+        if limit is not None:
+            values = values[-limit:] if limit > 0 else values[:0]
+        return values
+
+    @staticmethod
+    def _record(timestamp, latency, http_latency, status):
+        return {
+            'timestamp': format_timestamp(timestamp),
+            'latency': latency / LATENCY_SCALE if status == STATUS_OK else None,
+            'http_latency': None if http_latency == LATENCY_MISSING else http_latency / LATENCY_SCALE,
+            'status': STATUS_NAMES[status]
+        }
+
+    def count_since(self, since_ns):
+        """Return how many samples are newer than since_ns (binary search)"""
+        start = self.head - self.count  # Oldest sample; negative indexes wrap
+        timestamps = self.timestamps
+        older = bisect_right(range(self.count), since_ns, key=lambda k: timestamps[start + k])
+        return self.count - older
+
+    def last_timestamp(self):
+        """Return the newest sample's epoch-ns timestamp, or None if empty"""
+        return self.timestamps[self.head - 1] if self.count else None
+
+    def records(self, limit=None, since=None):
+        """Return the newest limit samples (all if None) as API records, oldest first
+
+        since (epoch ns) further restricts the result to newer samples.
+        Timestamps are only formatted for the samples returned.
+        """
+        if since is not None:
+            newer = self.count_since(since)
+            limit = newer if limit is None else min(limit, newer)
+        # Inlined rather than calling _record() per row; this runs for every
+        # sample of every host on each dashboard refresh
+        fmt = format_timestamp
+        return [
+            {
+                'timestamp': fmt(t),
+                'latency': l / LATENCY_SCALE if st == STATUS_OK else None,
+                'http_latency': None if h == LATENCY_MISSING else h / LATENCY_SCALE,
+                'status': STATUS_NAMES[st]
+            }
+            for t, l, h, st in zip(self._chronological(self.timestamps, limit),
+                                   self._chronological(self.latencies, limit),
+                                   self._chronological(self.http_latencies, limit),
+                                   self._chronological(self.statuses, limit))
+        ]
+
+    def latest(self):
+        """Return the most recent sample as an API record, or None"""
+        if not self.count:
+            return None
+        i = self.head - 1  # -1 wraps to the last slot
+        return self._record(self.timestamps[i], self.latencies[i],
+                            self.http_latencies[i], self.statuses[i])
+
+
+def parse_since(value):
+    """Convert a since= query value to epoch ns (None if not given)
+
+    since is the last_timestamp of an earlier response: integer epoch ns,
+    which is exact and timezone-free unlike the formatted timestamps.
+    Raises ValueError for anything else.
+    """
+    if value is None:
+        return None
+    return int(value)
+
+
 # In-memory storage for latency data
 monitored_hosts = load_hosts()  # Load from file or use defaults
-latency_data = {host: deque(maxlen=MAX_HISTORY) for host in monitored_hosts}
+latency_data = {host: LatencyRing() for host in monitored_hosts}
+# Bumped (under the write lock) whenever hosts or latency data change; seeded
+# from the clock so ETags from before a restart never match
+data_version = time.time_ns()
+_latency_cache = (-1, b'')  # (data_version, encoded /api/latency body)
+_current_cache = (-1, b'')  # (data_version, encoded /api/current body)
 
 # Oracle DB storage
 oracle_dbs = load_oracle_dbs()  # Load from file
-oracle_latency_data = {name: deque(maxlen=MAX_HISTORY) for name in oracle_dbs}
+oracle_latency_data = {name: LatencyRing() for name in oracle_dbs}
+
+class RWLock:
+    """Reader-writer lock: any number of readers, or a single writer
+
+    API reads far outnumber monitor writes, so readers shouldn't serialize
+    against each other. Waiting writers block new readers so the monitor
+    thread isn't starved by a steady stream of dashboard polls.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
 
-lock = threading.Lock()
+lock = RWLock()
 monitor_thread_started = False
 
+# Long-lived worker pool shared by every monitor cycle
+_probe_pool = ThreadPoolExecutor(max_workers=MAX_PROBE_WORKERS, thread_name_prefix='probe')
+
+# DNS cache: host -> (resolved_at, getaddrinfo results)
+_dns_cache = {}
+
+# Keep-alive HTTP connections reused across probes: host -> connection
+_http_connections = {}
+SSL_CONTEXT = ssl._create_unverified_context()  # Shared by all HTTPS probes
+_ping_sockets_allowed = True  # Cleared once the kernel refuses an ICMP ping socket
+
+
+def resolve_host(host, ttl=DNS_CACHE_TTL):
+    """Resolve a host via getaddrinfo, reusing the result for ttl seconds"""
+    now = time.monotonic()
+    cached = _dns_cache.get(host)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+
+    addrs = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    _dns_cache[host] = (now, addrs)
+    return addrs
+
+
+def timed_connect(address, timeout=None, source_address=None):
+    """Connect through the DNS cache, returning (socket, ns taken by the successful attempt)
+
+    Like socket.create_connection, each address is tried in turn, so a host
+    whose first (e.g. IPv6) address is unreachable still connects over the
+    next. Time spent on addresses that failed is not included.
+    """
+    host, port = address
+    error = None
+    for _, _, _, _, sockaddr in resolve_host(host):
+        start = time.perf_counter_ns()
+        try:
+            sock = socket.create_connection((sockaddr[0], port), timeout, source_address)
+        except OSError as e:
+            error = e
+            continue
+        return sock, time.perf_counter_ns() - start
+    raise error
+
+
+def create_connection(address, timeout=None, source_address=None):
+    """socket.create_connection that resolves the host through the DNS cache"""
+    return timed_connect(address, timeout, source_address)[0]
+
 
 def start_monitor_thread():
     """Start the monitoring thread (called once when module loads)"""
     global monitor_thread_started
     if not monitor_thread_started:
-        print(f"=== STARTING LATENCY MONITOR ===", flush=True)
-        print(f"Default hosts: {', '.join(monitored_hosts)}", flush=True)
-        print(f"Oracle DBs: {', '.join(oracle_dbs.keys()) if oracle_dbs else 'None'}", flush=True)
-        print(f"Check interval: {CHECK_INTERVAL} seconds", flush=True)
-        print(f"TCP port: {TCP_PORT}", flush=True)
-        print(f"Data retention: {MAX_HISTORY} data points (24 hours)", flush=True)
+        log.info("=== STARTING LATENCY MONITOR ===")
+        log.info("Default hosts: %s", ', '.join(monitored_hosts))
+        log.info("Oracle DBs: %s", ', '.join(oracle_dbs.keys()) if oracle_dbs else 'None')
+        log.info("Check interval: %s seconds", CHECK_INTERVAL)
+        log.info("TCP port: %s", TCP_PORT)
+        log.info("Data retention: %s data points (24 hours)", MAX_HISTORY)
 
         monitor_thread = threading.Thread(target=monitor_latency, daemon=True)
         monitor_thread.start()
+        threading.Thread(target=persist_hosts, daemon=True).start()
+        threading.Thread(target=persist_oracle_dbs, daemon=True).start()
         monitor_thread_started = True
-        print("=== MONITOR THREAD STARTED ===", flush=True)
+        log.info("=== MONITOR THREAD STARTED ===")
+        log_handler.flush()
+
+
+def _timed_head(conn):
+    """Send a HEAD request on conn and return the round-trip time in ms"""
+    if conn.sock is None:
+        # New connection, or http.client closed it after a Connection: close
+        # response; connect first so TCP/TLS setup isn't timed
+        conn.connect()
+    start = time.perf_counter_ns()
+    conn.request('HEAD', '/')
+    response = conn.getresponse()
+    response.read()
+    return (time.perf_counter_ns() - start) / 1e6
+
+
+def open_http_connection(host, protocol='https', timeout=5):
+    """Create an HTTP(S) connection that connects through the DNS cache"""
+    if protocol == 'https':
+        conn = http.client.HTTPSConnection(host, timeout=timeout, context=SSL_CONTEXT)
+    else:
+        conn = http.client.HTTPConnection(host, timeout=timeout)
+    # Connect to the cached address; Host header and TLS SNI still use the name
+    conn._create_connection = create_connection
+    return conn
+
+
+def http_probe(host, protocol='https'):
+    """
+    Measure HTTP HEAD latency to a host over a persistent connection
+
+    The connection is kept open between probes, and a new connection is
+    set up (TCP and TLS) before the timer starts, so every sample measures a
+    single request rather than connection setup.
+    """
+    conn = _http_connections.pop(host, None)
+    if conn is not None:
+        try:
+            latency_ms = _timed_head(conn)
+            _http_connections[host] = conn
+            return latency_ms
+        except (http.client.RemoteDisconnected, ConnectionError):
+            # Server closed the idle connection; retry on a fresh one
+            conn.close()
+        except Exception:
+            conn.close()
+            raise
+
+    conn = open_http_connection(host, protocol)
+    try:
+        latency_ms = _timed_head(conn)
+    except Exception:
+        conn.close()
+        raise
+    _http_connections[host] = conn
+    return latency_ms
+
+
+def icmp_ping(host, count=3, timeout=2):
+    """
+    Measure ICMP echo latency in-process using an unprivileged ping socket
+
+    Returns average latency in ms, or None if no replies were received.
+    Raises PermissionError if ping sockets are not allowed for this user.
+    """
+    family, _, _, _, sockaddr = resolve_host(host)[0]
+    if family == socket.AF_INET6:
+        proto, echo_request, echo_reply = socket.IPPROTO_ICMPV6, 128, 129
+    else:
+        proto, echo_request, echo_reply = socket.IPPROTO_ICMP, 8, 0
+
+    latencies = []
+    # The kernel fills in the identifier and checksum for ping sockets
+    with socket.socket(family, socket.SOCK_DGRAM, proto) as sock:
+        sock.settimeout(timeout)
+        for seq in range(1, count + 1):
+            packet = struct.pack('!BBHHH', echo_request, 0, 0, 0, seq) + b'latency-monitor'
+            start = time.perf_counter_ns()
+            sock.sendto(packet, (sockaddr[0], 0))
+            try:
+                while True:
+                    reply = sock.recv(1024)
+                    if reply[0] == echo_reply and struct.unpack('!H', reply[6:8])[0] == seq:
+                        latencies.append((time.perf_counter_ns() - start) / 1e6)
+                        break
+            except socket.timeout:
+                continue
+
+    if latencies:
+        return sum(latencies) / len(latencies)
+    return None
+
+
+# ping output: "rtt min/avg/max/mdev = 0.1/0.2/0.3/0.0 ms" and per-reply "time=0.2 ms"
+PING_AVG_RE = re.compile(rb'=\s*[\d.]+/([\d.]+)/')
+PING_TIME_RE = re.compile(rb'time=([\d.]+)')
+
+
+def ping_command(host, count=3, timeout=10):
+    """
+    Measure ICMP latency by running the system ping command
+
+    Used when unprivileged ping sockets are disabled. Output is read line by
+    line and the child is stopped as soon as the summary line or all count
+    replies have been seen.
+    Returns average latency in ms, or None if no replies were received.
+    """
+    # Ping the cached address, and -n skips reverse lookups on replies, so
+    # the subprocess does no DNS of its own
+    address = resolve_host(host)[0][4][0]
+    proc = subprocess.Popen(
+        ['ping', '-n', '-c', str(count), '-W', '2', address],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    killer = threading.Timer(timeout, proc.kill)  # Don't hang on a stuck ping
+    killer.start()
+
+    latencies = []
+    try:
+        for line in proc.stdout:  # bytes; the regexes scan it without decoding
+            match = PING_AVG_RE.search(line)
+            if match:
+                return float(match.group(1))
+            match = PING_TIME_RE.search(line)
+            if match:
+                latencies.append(float(match.group(1)))
+                if len(latencies) == count:
+                    break
+    finally:
+        killer.cancel()
+        if proc.poll() is None:
+            proc.terminate()
+        proc.wait()
+        proc.stdout.close()
+
+    if latencies:
+        return sum(latencies) / len(latencies)
+    return None
 
 
 def ping_host(host, port=443):
     """
-    Measure latency to a host using multiple methods
-    1. HTTP/HTTPS request (most reliable in CF)
-    2. TCP socket connection
+    Measure latency to a host
+
+    Returns (latency, http_latency) in ms. latency is the network round-trip
+    from the first method that succeeds:
+    1. TCP socket connection (SYN to SYN-ACK, excludes TLS and server time)
+    2. HTTP/HTTPS HEAD request on a kept-alive connection
     3. ICMP ping (fallback)
+    http_latency is the HEAD request time, or None if HTTP failed.
+
+    TCP and HTTP are each sampled PROBES_PER_CYCLE times and the minimum is
+    reported, since scheduling and queueing noise only ever adds latency.
     """
-    import socket
-    import urllib.request
-    import ssl
-    
-    # Method 1: HTTP/HTTPS Request (most reliable)
-    latencies = []
+    # HTTP/HTTPS Request on the kept-alive connection
+    # (http_probe already retries once if the idle connection was dropped)
+    http_latencies = []
     protocol = 'https' if port == 443 else 'http'
-    
-    for attempt in range(3):
+    for attempt in range(PROBES_PER_CYCLE):
         try:
-            start = time.time()
-            context = ssl._create_unverified_context()
-            req = urllib.request.Request(f'{protocol}://{host}', method='HEAD')
-            with urllib.request.urlopen(req, timeout=5, context=context) as response:
-                latency_ms = (time.time() - start) * 1000
-                latencies.append(latency_ms)
-                print(f"HTTP latency to {host}: {latency_ms:.2f}ms", flush=True)
+            latency_ms = http_probe(host, protocol)
+            http_latencies.append(latency_ms)
+            log.debug("HTTP latency to %s: %.2fms", host, latency_ms)
         except Exception as e:
-            print(f"HTTP request to {host} attempt {attempt+1} failed: {e}", flush=True)
-            continue
+            log.debug("HTTP request to %s attempt %d failed: %s", host, attempt + 1, e)
     
-    if latencies:
-        avg = sum(latencies) / len(latencies)
-        print(f"Average HTTP latency to {host}: {avg:.2f}ms", flush=True)
-        return avg
+    http_latency = None
+    if http_latencies:
+        http_latency = min(http_latencies)
+        log.info("HTTP latency to %s: %.2fms", host, http_latency)
     
-    # Method 2: TCP Socket Connection
-    print(f"HTTP failed for {host}, trying TCP socket...", flush=True)
-    for attempt in range(3):
+    # Method 1: TCP Socket Connection
+    latencies = []
+    for attempt in range(PROBES_PER_CYCLE):
         try:
-            start = time.time()
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(3)
-            sock.connect((host, port))
-            latency_ms = (time.time() - start) * 1000
+            # Only the attempt that connected is timed, not lookups or dead addresses
+            sock, elapsed_ns = timed_connect((host, port), timeout=3)
+            latency_ms = elapsed_ns / 1e6
             sock.close()
             latencies.append(latency_ms)
-            print(f"TCP latency to {host}:{port}: {latency_ms:.2f}ms", flush=True)
+            log.debug("TCP latency to %s:%s: %.2fms", host, port, latency_ms)
         except Exception as e:
-            print(f"TCP connection to {host}:{port} attempt {attempt+1} failed: {e}", flush=True)
+            log.debug("TCP connection to %s:%s attempt %d failed: %s", host, port, attempt + 1, e)
             continue
     
     if latencies:
-        avg = sum(latencies) / len(latencies)
-        print(f"Average TCP latency to {host}: {avg:.2f}ms", flush=True)
-        return avg
+        latency = min(latencies)
+        log.info("TCP latency to %s: %.2fms", host, latency)
+        return latency, http_latency
+    
+    # Method 2: HTTP latency when TCP connects are blocked
+    if http_latency is not None:
+        log.info("TCP failed for %s, using HTTP latency", host)
+        return http_latency, http_latency
     
     # Method 3: ICMP Ping (fallback)
-    print(f"TCP failed for {host}, trying ICMP ping...", flush=True)
+    log.info("TCP and HTTP failed for %s, trying ICMP ping...", host)
+    global _ping_sockets_allowed
     try:
-        result = subprocess.run(
-            ['ping', '-c', '3', '-W', '2', host],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        
-        if result.returncode == 0:
-            output = result.stdout
-            
-            for line in output.split('\n'):
-                if 'avg' in line or 'Average' in line:
-                    parts = line.split('=')[-1].strip().split('/')
-                    if len(parts) >= 2:
-                        latency = float(parts[1])
-                        print(f"ICMP ping latency to {host}: {latency:.2f}ms", flush=True)
-                        return latency
-            
-            latencies = []
-            for line in output.split('\n'):
-                if 'time=' in line:
-                    time_str = line.split('time=')[1].split()[0]
-                    latencies.append(float(time_str))
-            
-            if latencies:
-                avg = sum(latencies) / len(latencies)
-                print(f"Average ICMP latency to {host}: {avg:.2f}ms", flush=True)
-                return avg
+        latency = None
+        if _ping_sockets_allowed:
+            try:
+                latency = icmp_ping(host)
+            except PermissionError:
+                # Ping sockets are disabled (net.ipv4.ping_group_range); stop trying them
+                _ping_sockets_allowed = False
+                log.info("ICMP ping sockets not permitted, falling back to the ping command")
+        if not _ping_sockets_allowed:
+            latency = ping_command(host)
+        if latency is not None:
+            log.info("ICMP ping latency to %s: %.2fms", host, latency)
+            return latency, None
     except Exception as e:
-        print(f"ICMP ping to {host} failed: {e}", flush=True)
+        log.warning("ICMP ping to %s failed: %s", host, e)
     
-    print(f"All latency check methods failed for {host}", flush=True)
-    return None
+    log.warning("All latency check methods failed for %s", host)
+    return None, None
 
 
 def monitor_latency():
     """Background thread to continuously monitor latency"""
-    print("Monitor thread running...", flush=True)
+    global data_version
+    log.info("Monitor thread running...")
 
+    last_timestamp = 0
     while True:
-        timestamp = datetime.now().isoformat()
+        # Keep ring timestamps strictly increasing even if the wall clock steps
+        # back, so since= lookups (a binary search on them) stay correct
+        timestamp = last_timestamp = max(time.time_ns(), last_timestamp + 1)
 
         # Get current list of hosts (thread-safe)
-        with lock:
+        with lock.read():
             hosts_to_check = list(monitored_hosts)
             oracle_dbs_to_check = dict(oracle_dbs)
 
-        # Check regular hosts
+        # Dispatch every host and Oracle DB to the shared pool so one slow
+        # target doesn't delay the rest
+        futures = {}
+        if hosts_to_check:
+            log.info("Checking latency for %d hosts...", len(hosts_to_check))
         for host in hosts_to_check:
-            print(f"Checking latency for {host}...", flush=True)
-            latency = ping_host(host, TCP_PORT)
-
-            with lock:
-                # Initialize deque for new hosts
-                if host not in latency_data:
-                    latency_data[host] = deque(maxlen=MAX_HISTORY)
-
-                latency_data[host].append({
-                    'timestamp': timestamp,
-                    'latency': latency,
-                    'status': 'ok' if latency else 'down'
-                })
-
-        # Check Oracle DBs
+            futures[_probe_pool.submit(ping_host, host, TCP_PORT)] = (latency_data, host)
         for name, config in oracle_dbs_to_check.items():
-            print(f"Checking Oracle DB latency for {name}...", flush=True)
-            latency = test_oracle_connection(config)
-
-            with lock:
-                # Initialize deque for new Oracle DBs
-                if name not in oracle_latency_data:
-                    oracle_latency_data[name] = deque(maxlen=MAX_HISTORY)
-
-                oracle_latency_data[name].append({
-                    'timestamp': timestamp,
-                    'latency': latency,
-                    'status': 'ok' if latency else 'down'
-                })
+            log.info("Checking Oracle DB latency for %s...", name)
+            futures[_probe_pool.submit(oracle_probe, name, config)] = (oracle_latency_data, name)
 
-        print(f"Check complete. Sleeping for {CHECK_INTERVAL} seconds...", flush=True)
+        results = []
+        try:
+            for future in as_completed(futures, timeout=PROBE_BUDGET):
+                target = futures.pop(future)
+                try:
+                    results.append((target, future.result()))
+                except Exception as e:
+                    log.error("Check for %s failed: %s", target[1], e)
+                    results.append((target, None))
+        except FutureTimeout:
+            # Anything still pending missed this cycle's budget and is recorded as
+            # down. cancel() only drops probes still queued; running ones can't be
+            # interrupted and keep their worker until their own socket/ping/Oracle
+            # timeouts expire, so every probe path must stay bounded
+            for future, target in futures.items():
+                state = 'dropped from queue' if future.cancel() else 'left running'
+                log.warning("Check for %s exceeded %ss budget (%s), recording as down",
+                            target[1], PROBE_BUDGET, state)
+                results.append((target, None))
+
+        with lock.write():
+            for (history, key), result in results:
+                latency, http_latency = result if isinstance(result, tuple) else (result, None)
+                # Initialize history for new hosts and Oracle DBs
+                if key not in history:
+                    history[key] = LatencyRing()
+
+                history[key].append(timestamp, latency, http_latency)
+            data_version += 1
+
+        log.info("Check complete. Sleeping for %s seconds...", CHECK_INTERVAL)
+        log_handler.flush()
         time.sleep(CHECK_INTERVAL)
 
 
@@ -315,44 +1008,67 @@ start_monitor_thread()
 @app.route('/')
 def index():
     """Main dashboard"""
-    with lock:
+    with lock.read():
         hosts = list(monitored_hosts)
     return render_template('index.html', hosts=hosts, interval=CHECK_INTERVAL)
 
 
-@app.route('/static/<path:filename>')
-def serve_static(filename):
-    """Serve static files"""
-    return send_from_directory('static', filename)
-
-
 @app.route('/api/latency')
 def get_latency():
-    """API endpoint to get current latency data"""
-    global monitored_hosts
-    with lock:
-        # Reload from persistent storage to ensure workers are in sync
-        if os.path.exists(HOST_FILE):
-            try:
-                with open(HOST_FILE, 'r') as f:
-                    file_hosts = set(line.strip() for line in f.readlines() if line.strip())
-                    if file_hosts:
-                        monitored_hosts = file_hosts
-            except Exception as e:
-                print(f"Error reloading hosts: {e}", flush=True)
-        
+    """API endpoint to get current latency data
+
+    The full response is encoded once per data_version and reused until the
+    monitor appends new samples; clients revalidating with If-None-Match get
+    a 304 instead of the body. Pass since= (the last timestamp already seen)
+    to receive only newer samples; last_timestamp in the response is the
+    value to pass next time.
+    """
+    global _latency_cache
+    # Pick up changes from other workers
+    reload_hosts_if_changed()
+    limit = request.args.get('limit', type=int)  # Optional: only the newest N points
+    try:
+        since = parse_since(request.args.get('since'))  # Optional: only newer points
+    except ValueError:
+        return jsonify({'error': 'Invalid since parameter'}), 400
+
+    with lock.read():
+        version = data_version
+        etag = f"{version}-{limit}-{since}"
         hosts = list(monitored_hosts)
-        # Ensure all hosts have a data array (even if empty)
-        data_dict = {}
-        for host in hosts:
-            data_dict[host] = list(latency_data.get(host, []))
-        
-        return jsonify({
-            'hosts': hosts,
-            'data': data_dict,
-            'check_interval': CHECK_INTERVAL,
-            'max_history_hours': 24
-        })
+        rings = [latency_data.get(host) for host in hosts]
+        newest = max((ring.last_timestamp() for ring in rings if ring and ring.count), default=None)
+        # Only the ETag tracks data_version; a sample timestamp would miss
+        # host adds and removes, so no Last-Modified/If-Modified-Since
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            return response
+
+        if limit is None and since is None and _latency_cache[0] == version:
+            body = _latency_cache[1]
+        else:
+            # Ensure all hosts have a data array (even if empty)
+            data_dict = {}
+            for host, ring in zip(hosts, rings):
+                data_dict[host] = ring.records(limit, since) if ring else []
+
+            body = app.json.dumps({
+                'hosts': hosts,
+                'data': data_dict,
+                # Epoch ns as a string: it exceeds JavaScript's safe integer range
+                'last_timestamp': str(newest) if newest else None,
+                'check_interval': CHECK_INTERVAL,
+                'max_history_hours': 24
+            }).encode()
+            if limit is None and since is None:
+                _latency_cache = (version, body)
+
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Always revalidate, never reuse heuristically
+    return response
 
 
 @app.route('/api/latency/<host>')
@@ -361,45 +1077,68 @@ def get_host_latency(host):
     if host not in latency_data:
         return jsonify({'error': 'Host not found'}), 404
     
-    with lock:
+    limit = request.args.get('limit', type=int)  # Optional: only the newest N points
+    try:
+        since = parse_since(request.args.get('since'))  # Optional: only newer points
+    except ValueError:
+        return jsonify({'error': 'Invalid since parameter'}), 400
+
+    with lock.read():
+        newest = latency_data[host].last_timestamp()
         return jsonify({
             'host': host,
-            'data': list(latency_data[host]),
+            'data': latency_data[host].records(limit, since),
+            'last_timestamp': str(newest) if newest else None,
+            'stats': latency_data[host].stats(),
             'check_interval': CHECK_INTERVAL
         })
 
 
-@app.route('/api/current')
-def get_current():
-    """Get only the most recent latency for all hosts"""
-    with lock:
-        current = {}
+@app.route('/api/stats')
+def get_stats():
+    """Get 24-hour latency statistics (mean, stddev, min, max) for all hosts"""
+    with lock.read():
+        stats = {}
         for host in monitored_hosts:
-            if host in latency_data and latency_data[host]:
-                current[host] = latency_data[host][-1]
-            else:
-                current[host] = {'timestamp': None, 'latency': None, 'status': 'unknown'}
+            ring = latency_data.get(host)
+            stats[host] = ring.stats() if ring else dict(LatencyRing.EMPTY_STATS)
         
-        return jsonify(current)
+        return jsonify(stats)
+
+
+@app.route('/api/current')
+def get_current():
+    """Get only the most recent latency for all hosts
+
+    Encoded once per data_version; repeat polls return the cached bytes
+    without taking the lock.
+    """
+    global _current_cache
+    version, body = _current_cache
+    if version != data_version:
+        with lock.read():
+            version = data_version
+            current = {}
+            for host in monitored_hosts:
+                ring = latency_data.get(host)
+                if ring and ring.count:
+                    current[host] = ring.latest()
+                else:
+                    current[host] = {'timestamp': None, 'latency': None, 'http_latency': None, 'status': 'unknown'}
+
+            body = app.json.dumps(current).encode()
+            _current_cache = (version, body)
+
+    return app.response_class(body, mimetype=app.json.mimetype)
 
 
 @app.route('/api/hosts', methods=['GET'])
 def get_hosts():
     """Get list of currently monitored hosts"""
-    # Reload from file to ensure workers are in sync
-    global monitored_hosts
-    with lock:
-        # Reload from persistent storage
-        if os.path.exists(HOST_FILE):
-            try:
-                with open(HOST_FILE, 'r') as f:
-                    file_hosts = set(line.strip() for line in f.readlines() if line.strip())
-                    if file_hosts:
-                        monitored_hosts = file_hosts
-                        print(f"Reloaded {len(monitored_hosts)} hosts from file", flush=True)
-            except Exception as e:
-                print(f"Error reloading hosts: {e}", flush=True)
-        
+    # Pick up changes from other workers
+    reload_hosts_if_changed()
+
+    with lock.read():
         return jsonify({
             'hosts': list(monitored_hosts),
             'count': len(monitored_hosts)
@@ -409,6 +1148,7 @@ def get_hosts():
 @app.route('/api/hosts/add', methods=['POST'])
 def add_host():
     """Add a new host to monitor"""
+    global data_version
     data = request.get_json()
     
     if not data or 'host' not in data:
@@ -423,19 +1163,18 @@ def add_host():
     if len(host) > 253:  # Max domain length
         return jsonify({'error': 'Host name too long'}), 400
     
-    with lock:
+    with lock.write():
         if host in monitored_hosts:
             return jsonify({'error': 'Host already being monitored', 'host': host}), 409
         
         monitored_hosts.add(host)
-        # Initialize empty deque for new host
-        latency_data[host] = deque(maxlen=MAX_HISTORY)
+        data_version += 1
+        # Initialize empty history for new host
+        latency_data[host] = LatencyRing()
         current_hosts = list(monitored_hosts)
-        
-        # Persist the change
-        save_hosts()
+        hosts_dirty.set()  # Saved in the background by persist_hosts
     
-    print(f"Added new host: {host}. Total hosts: {len(current_hosts)}", flush=True)
+    log.info("Added new host: %s. Total hosts: %d", host, len(current_hosts))
     
     return jsonify({
         'success': True,
@@ -448,6 +1187,7 @@ def add_host():
 @app.route('/api/hosts/remove', methods=['POST'])
 def remove_host():
     """Remove a host from monitoring"""
+    global data_version
     data = request.get_json()
     
     if not data or 'host' not in data:
@@ -455,19 +1195,22 @@ def remove_host():
     
     host = data['host'].strip()
     
-    with lock:
+    with lock.write():
         if host not in monitored_hosts:
             return jsonify({'error': 'Host not found', 'host': host}), 404
         
         monitored_hosts.remove(host)
+        data_version += 1
+        _dns_cache.pop(host, None)
+        conn = _http_connections.pop(host, None)
+        if conn is not None:
+            conn.close()
         # Keep the historical data but stop monitoring
         # Data will still be accessible via API
         current_hosts = list(monitored_hosts)
-        
-        # Persist the change
-        save_hosts()
+        hosts_dirty.set()  # Saved in the background by persist_hosts
     
-    print(f"Removed host: {host}. Remaining hosts: {len(current_hosts)}", flush=True)
+    log.info("Removed host: %s. Remaining hosts: %d", host, len(current_hosts))
 
     return jsonify({
         'success': True,
@@ -478,21 +1221,31 @@ def remove_host():
     })
 
 
+@app.route('/api/dns/flush', methods=['POST'])
+def flush_dns():
+    """Drop cached DNS results so the next probe resolves every host again"""
+    global _dns_cache, _http_connections
+    # Swap in empty dicts rather than clearing under the lock: each rebind is
+    # atomic, and probes in flight just finish against the old objects
+    cache, _dns_cache = _dns_cache, {}
+    # Kept-alive connections still point at the old addresses
+    connections, _http_connections = _http_connections, {}
+    for conn in connections.values():
+        conn.close()
+
+    flushed = len(cache)
+    log.info("Flushed %d cached DNS entries", flushed)
+
+    return jsonify({'success': True, 'flushed': flushed})
+
+
 # ============== Oracle DB Endpoints ==============
 
 @app.route('/api/oracle', methods=['GET'])
 def get_oracle_dbs():
     """Get list of monitored Oracle DBs and their latency data"""
-    global oracle_dbs
-    with lock:
-        # Reload from persistent storage
-        if os.path.exists(ORACLE_FILE):
-            try:
-                with open(ORACLE_FILE, 'r') as f:
-                    oracle_dbs = json.load(f)
-            except Exception as e:
-                print(f"Error reloading Oracle DBs: {e}", flush=True)
-
+    reload_oracle_dbs_if_changed()
+    with lock.read():
         # Return DB info without passwords
         dbs_info = {}
         for name, config in oracle_dbs.items():
@@ -506,7 +1259,8 @@ def get_oracle_dbs():
         # Get latency data
         data_dict = {}
         for name in oracle_dbs:
-            data_dict[name] = list(oracle_latency_data.get(name, []))
+            ring = oracle_latency_data.get(name)
+            data_dict[name] = ring.records() if ring else []
 
         return jsonify({
             'databases': dbs_info,
@@ -549,15 +1303,15 @@ def add_oracle_db():
     if not config['host'] or not config['service'] or not config['user']:
         return jsonify({'error': 'Host, service, and user cannot be empty'}), 400
 
-    with lock:
+    with lock.write():
         if name in oracle_dbs:
             return jsonify({'error': 'Database name already exists', 'name': name}), 409
 
         oracle_dbs[name] = config
-        oracle_latency_data[name] = deque(maxlen=MAX_HISTORY)
-        save_oracle_dbs()
+        oracle_latency_data[name] = LatencyRing()
+        oracle_dirty.set()  # Saved in the background by persist_oracle_dbs
 
-    print(f"Added Oracle DB: {name} ({config['host']}:{config['port']}/{config['service']})", flush=True)
+    log.info("Added Oracle DB: %s (%s:%s/%s)", name, config['host'], config['port'], config['service'])
 
     return jsonify({
         'success': True,
@@ -577,15 +1331,16 @@ def remove_oracle_db():
 
     name = data['name'].strip()
 
-    with lock:
+    with lock.write():
         if name not in oracle_dbs:
             return jsonify({'error': 'Database not found', 'name': name}), 404
 
         del oracle_dbs[name]
         # Keep historical data but stop monitoring
-        save_oracle_dbs()
+        oracle_dirty.set()  # Saved in the background by persist_oracle_dbs
 
-    print(f"Removed Oracle DB: {name}. Remaining: {len(oracle_dbs)}", flush=True)
+    close_oracle_pool(name)
+    log.info("Removed Oracle DB: %s. Remaining: %d", name, len(oracle_dbs))
 
     return jsonify({
         'success': True,
@@ -638,14 +1393,48 @@ def health():
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
 
+def debug_host(host):
+    """Run DNS, HTTP, and TCP connectivity tests for one host"""
+    test_results = {
+        'http_test': None,
+        'tcp_test': None,
+        'dns_test': None
+    }
+    
+    # DNS Test: ttl=0 forces a fresh lookup, which also refreshes the DNS cache
+    # the HTTP and TCP tests below connect through
+    try:
+        sockaddr = resolve_host(host, ttl=0)[0][4]
+        test_results['dns_test'] = f'OK - Resolved to {sockaddr[0]}'
+    except Exception as e:
+        test_results['dns_test'] = f'FAILED - {str(e)}'
+        test_results['http_test'] = test_results['tcp_test'] = 'SKIPPED - DNS lookup failed'
+        return test_results
+    
+    # HTTP Test
+    conn = open_http_connection(host, 'https' if TCP_PORT == 443 else 'http')
+    try:
+        conn.request('HEAD', '/')
+        test_results['http_test'] = f'OK - Status {conn.getresponse().status}'
+    except Exception as e:
+        test_results['http_test'] = f'FAILED - {str(e)}'
+    finally:
+        conn.close()
+    
+    # TCP Test
+    try:
+        create_connection((host, TCP_PORT), timeout=3).close()
+        test_results['tcp_test'] = f'OK - Connected to port {TCP_PORT}'
+    except Exception as e:
+        test_results['tcp_test'] = f'FAILED - {str(e)}'
+    
+    return test_results
+
+
 @app.route('/debug')
 def debug():
     """Debug endpoint to test connectivity and show errors"""
-    import socket
-    import urllib.request
-    import ssl
-    
-    with lock:
+    with lock.read():
         hosts = list(monitored_hosts)
     
     debug_info = {
@@ -657,48 +1446,18 @@ def debug():
         'connectivity_tests': {}
     }
     
-    for host in hosts:
-        test_results = {
-            'http_test': None,
-            'tcp_test': None,
-            'dns_test': None
-        }
-        
-        # DNS Test
-        try:
-            ip = socket.gethostbyname(host)
-            test_results['dns_test'] = f'OK - Resolved to {ip}'
-        except Exception as e:
-            test_results['dns_test'] = f'FAILED - {str(e)}'
-        
-        # HTTP Test
-        try:
-            protocol = 'https' if TCP_PORT == 443 else 'http'
-            context = ssl._create_unverified_context()
-            req = urllib.request.Request(f'{protocol}://{host}', method='HEAD')
-            with urllib.request.urlopen(req, timeout=5, context=context) as response:
-                test_results['http_test'] = f'OK - Status {response.status}'
-        except Exception as e:
-            test_results['http_test'] = f'FAILED - {str(e)}'
-        
-        # TCP Test
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(3)
-            sock.connect((host, TCP_PORT))
-            sock.close()
-            test_results['tcp_test'] = f'OK - Connected to port {TCP_PORT}'
-        except Exception as e:
-            test_results['tcp_test'] = f'FAILED - {str(e)}'
-        
-        debug_info['connectivity_tests'][host] = test_results
+    # Test all hosts concurrently so the response takes as long as the slowest host
+    workers = max(1, min(MAX_PROBE_WORKERS, len(hosts)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(debug_host, hosts))
+    debug_info['connectivity_tests'] = dict(zip(hosts, results))
     
     # Show current data status
-    with lock:
+    with lock.read():
         debug_info['data_status'] = {
             host: {
                 'data_points': len(data),
-                'latest': data[-1] if data else None
+                'latest': data.latest()
             }
             for host, data in latency_data.items()
         }